@@ -1,86 +1,213 @@
 __all__ = [
-    'get_variables', 'get_all_inputs',
-    'Interpretation', 'evaluate',
+    'get_variable_mask', 'symbols_from_mask', 'get_variables',
+    'get_all_inputs',
+    'Interpretation', 'to_interpretation', 'evaluate',
     'TruthTable',
 ]
 
+import itertools
 from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import Dict, Generator, Set, Tuple
+from typing import Callable, Dict, Final, Iterator, List, Sequence, Set, Tuple
 
 from .parser import BinaryExpr, Expr, Symbol, UnaryExpr
 
 
-def get_variables(expr: Expr) -> Set[Symbol]:
-    variables = set()
-    def visit(expr: Expr) -> None:
-        if isinstance(expr, UnaryExpr):
-            visit(expr.value)
-        elif isinstance(expr, BinaryExpr):
-            visit(expr.left)
-            visit(expr.right)
-        elif isinstance(expr, Symbol):
-            variables.add(expr)
+def get_variable_mask(expr: Expr) -> int:
+    # Bit `s` is set if `Symbol(s)` occurs in `expr`.
+    mask = 0
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if type(e) is Symbol:
+            mask |= 1 << e
+        elif type(e) is UnaryExpr:
+            stack.append(e.value)
+        elif type(e) is BinaryExpr:
+            stack.append(e.left)
+            stack.append(e.right)
         else:
             raise RuntimeError
+    return mask
+
+
+def symbols_from_mask(mask: int) -> Tuple[Symbol, ...]:
+    # The symbols come out sorted.
+    return tuple(Symbol.from_index(i)
+                 for i in range(mask.bit_length()) if (mask >> i) & 1)
+
 
-    visit(expr)
-    return variables
+def get_variables(expr: Expr) -> Set[Symbol]:
+    return set(symbols_from_mask(get_variable_mask(expr)))
 
 
-def get_all_inputs(n: int) -> Generator[Tuple[bool, ...], None, None]:
-    if n > 1:
-        for subinput in get_all_inputs(n - 1):
-            yield (False,) + subinput
-            yield (True,) + subinput
-    elif n == 1:
-        yield (False,)
-        yield (True,)
-    else:
+def get_all_inputs(n: int) -> Iterator[Tuple[bool, ...]]:
+    if n < 1:
         raise ValueError(
             'number of variables must be a positive number')
+    return itertools.product((False, True), repeat=n)
+
+
+# Bit `s` holds the value of `Symbol(s)`.
+Interpretation = int
+
 
+def to_interpretation(values: Mapping[Symbol, bool]) -> Interpretation:
+    interpr = 0
+    for s, v in values.items():
+        if v:
+            interpr |= 1 << s
+    return interpr
 
-Interpretation = Mapping[Symbol, bool]
+
+_binary_funcs: Dict[str, Callable[[int, int], int]] = {
+    '&': lambda a, b: a and b,
+    '|': lambda a, b: a or b,
+    '~': lambda a, b: (not a) or b,
+    '=': lambda a, b: a == b,
+}
 
 
 def evaluate(expr: Expr, interpr: Interpretation) -> bool:
-    def eval_subexpr(e: Expr) -> bool:
-        if isinstance(e, Symbol):
-            return interpr[e]
-        elif isinstance(e, UnaryExpr):
+    def eval_subexpr(e: Expr) -> int:
+        if type(e) is Symbol:
+            return (interpr >> e) & 1
+        elif type(e) is UnaryExpr:
             if e.op == '!':
                 return not eval_subexpr(e.value)
             else:
                 raise RuntimeError
-        elif isinstance(e, BinaryExpr):
-            left = eval_subexpr(e.left)
-            right = eval_subexpr(e.right)
-
-            if e.op == '&':
-                return left and right
-            elif e.op == '|':
-                return left or right
-            elif e.op == '~':
-                return not (left and not right)
-            elif e.op == '=':
-                return left == right
+        elif type(e) is BinaryExpr:
+            return _binary_funcs[e.op](
+                eval_subexpr(e.left), eval_subexpr(e.right))
+        else:
+            raise RuntimeError
+    return bool(eval_subexpr(expr))
+
+
+_PUSH, _NOT, _AND, _OR, _IMPL, _EQV = range(6)
+_unary_opcodes = {'!': _NOT}
+_binary_opcodes = {'&': _AND, '|': _OR, '~': _IMPL, '=': _EQV}
+
+_Program = List[Tuple[int, ...]]
+
+
+def _flatten(expr: Expr, var_index: Mapping[Symbol, int]) -> _Program:
+    # Lists the distinct subexpressions of `expr` children first, as
+    # (_PUSH, var) or (opcode, *child indices); the root comes last.
+    # Equal subtrees map to the same node, so they are only computed once.
+    nodes: _Program = []
+    numbering: Dict[Tuple[int, ...], int] = {}
+    results: List[int] = []
+    stack: List[Tuple[Expr, bool]] = [(expr, False)]
+    while stack:
+        e, visited = stack.pop()
+        if type(e) is Symbol:
+            node: Tuple[int, ...] = (_PUSH, var_index[e])
+        elif type(e) is UnaryExpr:
+            if not visited:
+                stack.append((e, True))
+                stack.append((e.value, False))
+                continue
+            node = (_unary_opcodes[e.op], results.pop())
+        elif type(e) is BinaryExpr:
+            if not visited:
+                stack.append((e, True))
+                stack.append((e.right, False))
+                stack.append((e.left, False))
+                continue
+            right = results.pop()
+            left = results.pop()
+            node = (_binary_opcodes[e.op], left, right)
+        else:
+            raise RuntimeError
+
+        i = numbering.get(node)
+        if i is None:
+            i = numbering[node] = len(nodes)
+            nodes.append(node)
+        results.append(i)
+    return nodes
+
+
+def _run(nodes: _Program, values: Sequence[int], full: int) -> int:
+    # Works on bits: `full` has one bit set for each row being evaluated.
+    res: List[int] = []
+    push = res.append
+    for node in nodes:
+        t = node[0]
+        if t == _PUSH:
+            push(values[node[1]])
+        elif t == _NOT:
+            push(~res[node[1]] & full)
+        else:
+            left = res[node[1]]
+            right = res[node[2]]
+            if t == _AND:
+                push(left & right)
+            elif t == _OR:
+                push(left | right)
+            elif t == _IMPL:
+                push((~left | right) & full)
+            elif t == _EQV:
+                push(~(left ^ right) & full)
             else:
                 raise RuntimeError
+    return res[-1]
+
+
+# 64 rows of the column for input bit b, so tables of up to six variables
+# need no construction at all.
+_word_columns: Final = (
+    0xAAAAAAAAAAAAAAAA,
+    0xCCCCCCCCCCCCCCCC,
+    0xF0F0F0F0F0F0F0F0,
+    0xFF00FF00FF00FF00,
+    0xFFFF0000FFFF0000,
+    0xFFFFFFFF00000000,
+)
+
+
+def _compile_bitmask(expr: Expr, var_order: Sequence[Symbol]) -> int:
+    # Evaluates all rows at once: bit j of each value is its result for the
+    # j-th input, counting in binary with the first variable as the MSB.
+    n = len(var_order)
+    width = 1 << n
+    full = (1 << width) - 1
+
+    masks = []
+    for i in range(n):
+        b = n - 1 - i
+        if b < len(_word_columns):
+            mask = _word_columns[b]
+            period = 64
         else:
-            raise RuntimeError
-    return eval_subexpr(expr)
+            half = 1 << b
+            mask = ((1 << half) - 1) << half
+            period = half << 1
+        while period < width:
+            mask |= mask << period
+            period <<= 1
+        masks.append(mask & full)
+
+    nodes = _flatten(expr, {s: i for i, s in enumerate(var_order)})
+    return _run(nodes, masks, full)
 
 
 @dataclass
 class TruthTable:
-    variables: Tuple[Symbol]
+    variables: Tuple[Symbol, ...]
     data: Dict[Tuple[bool, ...], bool]
 
     @classmethod
     def from_expr(cls, expr: Expr) -> 'TruthTable':
-        tt = cls(tuple(sorted(get_variables(expr))), {})
-        for subinput in get_all_inputs(len(tt.variables)):
-            interpl = {s: v for s, v in zip(tt.variables, subinput)}
-            tt.data[subinput] = evaluate(expr, interpl)
+        tt = cls(symbols_from_mask(get_variable_mask(expr)), {})
+        n = len(tt.variables)
+        inputs = get_all_inputs(n)
+        result = _compile_bitmask(expr, tt.variables)
+        # product() counts in binary with the first variable as the MSB,
+        # which is the row order used by _compile_bitmask, so the reversed
+        # binary string holds the result of the j-th input at index j.
+        bits = format(result, f'0{1 << n}b')[::-1]
+        tt.data.update(zip(inputs, map('1'.__eq__, bits)))
         return tt
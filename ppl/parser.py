@@ -1,21 +1,31 @@
 __all__ = [
-    'Symbol', 'UnaryExpr', 'BinaryExpr', 'Expr', 'tokenize', 'parse']
+    'Symbol', 'UnaryExpr', 'BinaryExpr', 'Expr',
+    'LexerError', 'NoParseError', 'Token', 'tokenize', 'parse']
 
 import string
 from dataclasses import dataclass
-from typing import List, Literal, Sequence, Tuple, Union, cast
-
-from funcparserlib.lexer import Token, TokenSpec, make_tokenizer
-from funcparserlib.parser import Parser, finished, forward_decl, many, tok
+from typing import (
+    ClassVar, Final, List, Literal, NamedTuple, Sequence, Tuple, Union)
 
 
 class Symbol(int):
+    _CACHE: ClassVar[Tuple['Symbol', ...]] = ()
+
     @classmethod
     def from_letter(cls, letter: str) -> 'Symbol':
-        try:
-            return cls(string.ascii_uppercase.find(letter.upper()))
-        except IndexError:
-            raise ValueError('invalid symbol letter')
+        if len(letter) == 1:
+            c = ord(letter)
+            if 65 <= c <= 90:  # A-Z
+                return cls._CACHE[c - 65]
+            if 97 <= c <= 122:  # a-z
+                return cls._CACHE[c - 97]
+        raise ValueError('invalid symbol letter')
+
+    @classmethod
+    def from_index(cls, index: int) -> 'Symbol':
+        if 0 <= index < len(cls._CACHE):
+            return cls._CACHE[index]
+        raise ValueError('invalid symbol index')
 
     def __str__(self) -> str:
         return string.ascii_uppercase[self]
@@ -24,18 +34,26 @@ class Symbol(int):
         return f'{type(self).__name__}({int(self)!r})'
 
 
+# Every symbol read by the parser is one of these shared instances.
+Symbol._CACHE = tuple(int.__new__(Symbol, i) for i in range(26))
+
+
 _UnaryOp = Literal['!']
 _BinaryOp = Literal['&', '|', '~', '=']
 
 
 @dataclass
 class UnaryExpr:
+    __slots__ = ('op', 'value')
+
     op: _UnaryOp
     value: 'Expr'
 
 
 @dataclass
 class BinaryExpr:
+    __slots__ = ('op', 'left', 'right')
+
     op: _BinaryOp
     left: 'Expr'
     right: 'Expr'
@@ -44,53 +62,120 @@ class BinaryExpr:
 Expr = Union[UnaryExpr, BinaryExpr, Symbol]
 
 
-def tokenize(s: str) -> List[Token]:
-    specs = [
-        TokenSpec('ws', r'\s+'),
-        TokenSpec('symbol', r'[A-Za-z]'),
-        TokenSpec('op', r'[!&|~=()]'),
-    ]
-    return [t for t in make_tokenizer(specs)(s) if t.type != 'ws']
-
+class LexerError(Exception):
+    pass
 
-def _op(name: str) -> Parser[Token, str]:
-    return tok('op', name)
 
+class NoParseError(Exception):
+    pass
 
-def _to_unary_expr(args: Tuple[str, Expr]) -> UnaryExpr:
-    op, expr = args
-    # FIXME
-    return UnaryExpr(cast(_UnaryOp, op), expr)
 
+class Token(NamedTuple):
+    type: str
+    value: str
+    line: int
+    column: int
 
-def _to_binary_expr(
-        args: Tuple[Expr, List[Tuple[str, Expr]]]) -> Expr:
-    first, rest = args
-    result = first
-    for op, expr in rest:
-        # FIXME
-        result = BinaryExpr(cast(_BinaryOp, op), result, expr)
-    return result
 
+_symbol_chars: Final = frozenset(string.ascii_letters)
+_op_chars: Final = frozenset('!&|~=()')
 
-def parse(tokens: Sequence[Token]) -> Expr:
-    symbol = tok('symbol') >> Symbol.from_letter
 
-    expr = forward_decl()
-
-    paren = -_op('(') + expr + -_op(')')
-    primary: Parser[Token, Expr] = forward_decl()
-    neg = _op('!') + primary >> _to_unary_expr
-    primary.define(symbol | neg | paren)
+def tokenize(s: str) -> List[Token]:
+    tokens = []
+    line = 1
+    line_start = 0
+    for i, c in enumerate(s):
+        if c in _symbol_chars:
+            tokens.append(Token('symbol', c, line, i - line_start + 1))
+        elif c in _op_chars:
+            tokens.append(Token('op', c, line, i - line_start + 1))
+        elif c.isspace():
+            if c == '\n':
+                line += 1
+                line_start = i + 1
+        else:
+            line_end = s.find('\n', i)
+            if line_end < 0:
+                line_end = len(s)
+            raise LexerError(
+                f'cannot tokenize data: {line},{i - line_start + 1}: '
+                f'"{s[line_start:line_end]}"')
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: Sequence[Token]) -> None:
+        self._tokens = tokens
+        self._pos = 0
+
+    def _error(self, expected: str) -> NoParseError:
+        if self._pos < len(self._tokens):
+            t = self._tokens[self._pos]
+            return NoParseError(
+                f'{t.line},{t.column}: got unexpected token: {t.value!r}, '
+                f'expected: {expected}')
+        else:
+            return NoParseError(
+                f'got unexpected end of input, expected: {expected}')
+
+    def _accept(self, op: str) -> bool:
+        if self._pos < len(self._tokens):
+            t = self._tokens[self._pos]
+            if t.type == 'op' and t.value == op:
+                self._pos += 1
+                return True
+        return False
+
+    def expect_end(self) -> None:
+        if self._pos < len(self._tokens):
+            raise self._error('end of input')
+
+    def bicond(self) -> Expr:
+        result = self.matcond()
+        while self._accept('='):
+            result = BinaryExpr('=', result, self.matcond())
+        return result
+
+    def matcond(self) -> Expr:
+        result = self.disj()
+        while self._accept('~'):
+            result = BinaryExpr('~', result, self.disj())
+        return result
+
+    def disj(self) -> Expr:
+        result = self.conj()
+        while self._accept('|'):
+            result = BinaryExpr('|', result, self.conj())
+        return result
+
+    def conj(self) -> Expr:
+        result = self.primary()
+        while self._accept('&'):
+            result = BinaryExpr('&', result, self.primary())
+        return result
+
+    def primary(self) -> Expr:
+        if self._pos < len(self._tokens):
+            t = self._tokens[self._pos]
+            if t.type == 'symbol':
+                self._pos += 1
+                return Symbol.from_letter(t.value)
+        if self._accept('!'):
+            return UnaryExpr('!', self.primary())
+        if self._accept('('):
+            expr = self.bicond()
+            if not self._accept(')'):
+                raise self._error("')'")
+            return expr
+        raise self._error("symbol, '!' or '('")
 
-    conj = primary + many(_op('&') + primary) >> _to_binary_expr
-    disj = conj + many(_op('|') + conj) >> _to_binary_expr
-    matcond = disj + many(_op('~') + disj) >> _to_binary_expr
-    bicond = matcond + many(_op('=') + matcond) >> _to_binary_expr
-    expr.define(bicond)
 
-    document = expr + -finished
-    return document.parse(tokens)
+def parse(tokens: Sequence[Token]) -> Expr:
+    p = _Parser(tokens)
+    expr = p.bicond()
+    p.expect_end()
+    return expr
 
 
 if __name__ == '__main__':
@@ -1,25 +1,36 @@
 __all__ = ['UICmd']
 
-from typing import Final, Literal, Tuple
+from typing import Final, Literal
 import cmd
-from funcparserlib.lexer import LexerError
-from funcparserlib.parser import NoParseError
-from .parser import Expr, Symbol, UnaryExpr, BinaryExpr, parse, tokenize
-from .eval import TruthTable, evaluate, get_variables
+import functools
+import io
+from .parser import (
+    Expr, Symbol, UnaryExpr, BinaryExpr, LexerError, NoParseError, parse,
+    tokenize)
+from .eval import (
+    TruthTable, evaluate, get_all_inputs, get_variable_mask,
+    symbols_from_mask, to_interpretation)
 
 _precedence: Final = ['=', '~', '|', '&', '!']
+_precedence_rank: Final = {op: i for i, op in enumerate(_precedence)}
 _unicode_ops: Final = {
     '=': '↔', '~': '→', '|': '∨', '&': '∧', '!': '¬'}
 
 
+@functools.lru_cache(maxsize=128)
+def _cached_parse(s: str) -> Expr:
+    # ASTs are never mutated, so one can be shared by several expressions.
+    return parse(tokenize(s))
+
+
 def _format_expr(expr: Expr, *, unicode: bool = False) -> str:
     def format_subexpr(e: Expr, op: str) -> str:
-        if isinstance(e, Symbol):
+        if type(e) is Symbol:
             return str(e)
-        elif isinstance(e, UnaryExpr):
+        elif type(e) is UnaryExpr:
             return _format_expr(e, unicode=u)
-        elif isinstance(e, BinaryExpr):
-            if _precedence.index(e.op) < _precedence.index(op):
+        elif type(e) is BinaryExpr:
+            if _precedence_rank[e.op] < _precedence_rank[op]:
                 return f'({_format_expr(e, unicode=u)})'
             else:
                 return _format_expr(e, unicode=u)
@@ -28,17 +39,17 @@ def _format_expr(expr: Expr, *, unicode: bool = False) -> str:
 
     buf = []
     u = unicode
-    if isinstance(expr, Symbol):
+    if type(expr) is Symbol:
         return str(expr)
-    elif isinstance(expr, UnaryExpr):
+    elif type(expr) is UnaryExpr:
         buf.append(_unicode_ops[expr.op] if u else expr.op)
-        if isinstance(expr.value, Symbol):
+        if type(expr.value) is Symbol:
             buf.append(str(expr.value))
         else:
             buf.append('(')
             buf.append(_format_expr(expr.value, unicode=u))
             buf.append(')')
-    elif isinstance(expr, BinaryExpr):
+    elif type(expr) is BinaryExpr:
         buf.append(format_subexpr(expr.left, expr.op))
         buf.append(' ')
         buf.append(_unicode_ops[expr.op] if u else expr.op)
@@ -48,62 +59,46 @@ def _format_expr(expr: Expr, *, unicode: bool = False) -> str:
 
 
 def _format_tt(tt: TruthTable, expr_str: str, *, unicode: bool = False) -> str:
-    def values_key(values: Tuple[bool, ...]) -> int:
-        return int(''.join('1' if v else '0' for v in values), 2)
-
     u = unicode
-    buf = []
-    col_1_width = len(tt.variables) * 2 + 1
+    n = len(tt.variables)
+    col_1_width = n * 2 + 1
     col_2_width = len(expr_str) + 2
-
-    buf.append('┌' if u else '/')
-    buf.append(('─' if u else '-') * col_1_width)
-    buf.append('┬' if u else '+')
-    buf.append(('─' if u else '-') * col_2_width)
-    buf.append('┐' if u else '\\')
-    buf.append('\n')
-
-    buf.append('│' if u else '|')
-    buf.append(' ')
-    buf.append(' '.join(str(s) for s in tt.variables))
-    buf.append(' ')
-    buf.append('│' if u else '|')
-    buf.append(' ')
-    buf.append(expr_str)
-    buf.append(' ')
-    buf.append('│' if u else '|')
-    buf.append('\n')
-
-    for i, values in enumerate(sorted(tt.data, key=values_key)):
-        result = tt.data[values]
-        if i:
-            buf.append('├' if u else '+')
-            buf.append(('─' if u else '-') * col_1_width)
-            buf.append('┼' if u else '+')
-            buf.append(('─' if u else '-') * col_2_width)
-            buf.append('┤' if u else '+')
-        else:
-            buf.append('┝' if u else '+')
-            buf.append(('━' if u else '-') * col_1_width)
-            buf.append('┿' if u else '+')
-            buf.append(('━' if u else '-') * col_2_width)
-            buf.append('┥' if u else '+')
-        buf.append('\n')
-
-        buf.append('│' if u else '|')
-        buf.append(' ')
-        buf.append(' '.join('1' if v else '0' for v in values))
-        buf.append(' │')
-        buf.append(('1' if result else '0').center(col_2_width))
-        buf.append('│\n')
-
-    buf.append('└' if u else '\\')
-    buf.append(('─' if u else '-') * col_1_width)
-    buf.append('┴' if u else '+')
-    buf.append(('─' if u else '-') * col_2_width)
-    buf.append('┘\n')
-
-    return ''.join(buf)
+    line = '─' if u else '-'
+    thick_line = '━' if u else '-'
+    v_line = '│' if u else '|'
+    top_left, top_right = ('┌', '┐') if u else ('/', '\\')
+    bottom_left = '└' if u else '\\'
+
+    top = (top_left + line * col_1_width + ('┬' if u else '+')
+           + line * col_2_width + top_right + '\n')
+    header = (v_line + ' ' + ' '.join(str(s) for s in tt.variables) + ' '
+              + v_line + ' ' + expr_str + ' ' + v_line + '\n')
+    first_sep = (('┝' if u else '+') + thick_line * col_1_width
+                 + ('┿' if u else '+') + thick_line * col_2_width
+                 + ('┥' if u else '+') + '\n')
+    sep = (('├' if u else '+') + line * col_1_width + ('┼' if u else '+')
+           + line * col_2_width + ('┤' if u else '+') + '\n')
+    bottom = (bottom_left + line * col_1_width + ('┴' if u else '+')
+              + line * col_2_width + '┘\n')
+    results = (' │' + '0'.center(col_2_width) + '│\n',
+               ' │' + '1'.center(col_2_width) + '│\n')
+
+    out = io.StringIO()
+    w = out.write
+    w(top)
+    w(header)
+
+    # Inputs come out in binary counting order, so row i reads as i itself.
+    row_format = f'0{n}b'
+    row_start = v_line + ' '
+    for i, values in enumerate(get_all_inputs(n)):
+        w(sep if i else first_sep)
+        w(row_start)
+        w(' '.join(format(i, row_format)))
+        w(results[tt.data[values]])
+
+    w(bottom)
+    return out.getvalue()
 
 
 class UICmd(cmd.Cmd):
@@ -113,6 +108,21 @@ class UICmd(cmd.Cmd):
     def __init__(self) -> None:
         super().__init__()
         self._exprs = {}
+        self._tt_cache = {}
+        self._format_cache = {}
+
+    def _get_expr_str(self, s: Symbol, *, unicode: bool = False) -> str:
+        key = (s, unicode)
+        expr_str = self._format_cache.get(key)
+        if expr_str is None:
+            expr_str = self._format_cache[key] = _format_expr(
+                self._exprs[s], unicode=unicode)
+        return expr_str
+
+    def _forget(self, s: Symbol) -> None:
+        self._tt_cache.pop(s, None)
+        self._format_cache.pop((s, False), None)
+        self._format_cache.pop((s, True), None)
 
     def _get_valid_name(self, letter: str, *, no_exist: bool = False) -> Symbol:
         if letter:
@@ -153,10 +163,10 @@ class UICmd(cmd.Cmd):
                 s = self._get_valid_name(arg)
             except ValueError:
                 return
-            print(f'{s}: {_format_expr(self._exprs[s], unicode=unicode)}')
+            print(f'{s}: {self._get_expr_str(s, unicode=unicode)}')
         else:
-            for symbol, expr in self._exprs.items():
-                print(f'{symbol}: {_format_expr(expr, unicode=unicode)}')
+            for symbol in self._exprs:
+                print(f'{symbol}: {self._get_expr_str(symbol, unicode=unicode)}')
 
     def do_listu(self, arg: str) -> None:
         """以 Unicode 字符列出所有已添加的表达式，或指定的表达式。另见 list 命令。"""
@@ -170,7 +180,7 @@ class UICmd(cmd.Cmd):
             return
 
         try:
-            expr = parse(tokenize(input('输入表达式: ')))
+            expr = _cached_parse(input('输入表达式: '))
         except LexerError as e:
             print(f'词法分析错误: {e}')
             return
@@ -178,6 +188,7 @@ class UICmd(cmd.Cmd):
             print(f'语法分析错误: {e}')
             return
         self._exprs[expr_name] = expr
+        self._forget(expr_name)
 
     def do_del(self, arg: str) -> None:
         """删除已有的表达式。\n\ndel 表达式名"""
@@ -186,6 +197,7 @@ class UICmd(cmd.Cmd):
         except ValueError:
             return
         self._exprs.pop(s)
+        self._forget(s)
 
     def do_tt(self, arg: str, *, unicode: bool = False) -> None:
         """打印表达式的真值表。\n\ntt 表达式名"""
@@ -193,9 +205,11 @@ class UICmd(cmd.Cmd):
             s = self._get_valid_name(arg)
         except ValueError:
             return
-        tt = TruthTable.from_expr(self._exprs[s])
+        tt = self._tt_cache.get(s)
+        if tt is None:
+            tt = self._tt_cache[s] = TruthTable.from_expr(self._exprs[s])
         if tt.variables:
-            print(_format_tt(tt, _format_expr(self._exprs[s], unicode=unicode), unicode=unicode), end='')
+            print(_format_tt(tt, self._get_expr_str(s, unicode=unicode), unicode=unicode), end='')
         else:
             print('给定的表达式没有变量。')
 
@@ -210,8 +224,7 @@ class UICmd(cmd.Cmd):
         except ValueError:
             return
         expr = self._exprs[expr_name]
-        variables = list(get_variables(expr))
-        variables.sort()
+        variables = symbols_from_mask(get_variable_mask(expr))
         if not variables:
             print('给定表达式不包含任何变量。')
             return
@@ -220,4 +233,4 @@ class UICmd(cmd.Cmd):
         print('分别为每个变量指定值。')
         for var_name in variables:
             interpt[var_name] = bool(int(input(f'{var_name} = ')))
-        print(f'值是 {int(evaluate(expr, interpt))}。')
+        print(f'值是 {int(evaluate(expr, to_interpretation(interpt)))}。')